@@ -0,0 +1,167 @@
+"""
+Numba kernel for the technical indicators used as LSTM features.
+
+build_features makes a single pass over a float64 price array, keeping
+rolling windows as running sums (add the entering price, subtract the
+leaving one). The output has the same length as the input, with NaN during
+the warm-up period, and matches the pandas definitions used in training.
+
+The kernel is compiled for its explicit signature when the module is
+imported. If the ahead-of-time build from build_kernels.py (``_kernels_aot``)
+is present and was built from this exact source (SOURCE_HASH), its compiled
+function is used instead and no JIT is needed. A stale or incomplete build
+is ignored.
+"""
+import hashlib
+
+import numpy as np
+
+from _njit import njit
+
+try:
+    import _kernels_aot
+except ImportError:
+    _kernels_aot = None
+
+# Bump whenever build_features output changes; cached feature files key on it
+FEATURE_VERSION = 1
+
+# Identifies the source an AOT build was compiled from (fits in an int64)
+with open(__file__, 'rb') as _source:
+    SOURCE_HASH = int(hashlib.sha256(_source.read()).hexdigest()[:15], 16)
+
+SIGNATURES = {
+    '_build_features': 'float32[:, ::1](float64[::1], int64, int64, int64, int64, int64, float64)',
+}
+
+
+def _kernel(func):
+    """
+    Compile func for its entry in SIGNATURES, or take the AOT-compiled version
+    if it was built from this source.
+    """
+    if _kernels_aot is not None:
+        try:
+            if _kernels_aot.source_hash() == SOURCE_HASH:
+                return getattr(_kernels_aot, func.__name__)
+        except AttributeError:
+            # Built before source_hash was exported, or without this kernel
+            pass
+    return njit(SIGNATURES[func.__name__], cache=True, error_model='numpy')(func)
+
+
+@njit(cache=True, inline='always')
+def _divide(numerator, denominator):
+    """
+    IEEE division (x/0 gives +-inf or NaN), which AOT builds don't do natively.
+    """
+    if denominator != 0.0:
+        return numerator / denominator
+    if numerator > 0.0:
+        return np.inf
+    if numerator < 0.0:
+        return -np.inf
+    return np.nan
+
+
+@_kernel
+def _build_features(close, rsi_window, ema_window, sma_short_window,
+                    sma_long_window, bb_window, bb_std):
+    """
+    All 11 LSTM features in one fused pass over the close prices.
+
+    Columns follow the FEATURES order: close, rsi_14, ema_30, sma_10,
+    sma_50, bb_upper, bb_lower, bb_width, bb_position, price_sma10_ratio,
+    price_sma50_ratio. Rows before the longest window are NaN.
+
+    Running sums are kept in float64 (a float32 sum of squared prices loses
+    the variance); only the output, which is what the model sees, is float32.
+    """
+    n = close.shape[0]
+    out = np.full((n, 11), np.nan, dtype=np.float32)
+    alpha = 2.0 / (ema_window + 1)
+
+    gain_sum = 0.0
+    loss_sum = 0.0
+    sma_short_sum = 0.0
+    sma_long_sum = 0.0
+    bb_sum = 0.0
+    bb_sumsq = 0.0
+    ema = close[0]
+
+    for i in range(n):
+        price = close[i]
+        out[i, 0] = price
+
+        # RSI: rolling average gain/loss of price changes
+        if i > 0:
+            delta = price - close[i - 1]
+            if delta > 0:
+                gain_sum += delta
+            else:
+                loss_sum -= delta
+        if i >= rsi_window:
+            old_delta = close[i - rsi_window] - close[i - rsi_window - 1] if i > rsi_window else 0.0
+            if old_delta > 0:
+                gain_sum -= old_delta
+            else:
+                loss_sum += old_delta
+        if i >= rsi_window - 1:
+            rs = _divide(gain_sum / rsi_window, loss_sum / rsi_window)
+            out[i, 1] = 100.0 - 100.0 / (1.0 + rs)
+
+        # EMA without bias adjustment
+        if i > 0:
+            ema = alpha * price + (1.0 - alpha) * ema
+        out[i, 2] = ema
+
+        # Short and long SMA
+        sma_short_sum += price
+        if i >= sma_short_window:
+            sma_short_sum -= close[i - sma_short_window]
+        if i >= sma_short_window - 1:
+            sma_short = sma_short_sum / sma_short_window
+            out[i, 3] = sma_short
+            out[i, 9] = _divide(price, sma_short)
+
+        sma_long_sum += price
+        if i >= sma_long_window:
+            sma_long_sum -= close[i - sma_long_window]
+        if i >= sma_long_window - 1:
+            sma_long = sma_long_sum / sma_long_window
+            out[i, 4] = sma_long
+            out[i, 10] = _divide(price, sma_long)
+
+        # Bollinger Bands from running sum and sum of squares (sample std)
+        bb_sum += price
+        bb_sumsq += price * price
+        if i >= bb_window:
+            leaving = close[i - bb_window]
+            bb_sum -= leaving
+            bb_sumsq -= leaving * leaving
+        if i >= bb_window - 1:
+            mean = bb_sum / bb_window
+            variance = max((bb_sumsq - bb_sum * mean) / (bb_window - 1), 0.0)
+            std = np.sqrt(variance)
+            upper = mean + std * bb_std
+            lower = mean - std * bb_std
+            out[i, 5] = upper
+            out[i, 6] = lower
+            out[i, 7] = upper - lower
+            out[i, 8] = _divide(price - lower, upper - lower)
+
+    return out
+
+
+def build_features(close, rsi_window=14, ema_window=30, sma_short_window=10,
+                   sma_long_window=50, bb_window=20, bb_std=2.0):
+    """
+    Build the float32 (len(close), 11) feature matrix with training's windows.
+    """
+    # Compiled signatures take writeable C-contiguous float64 arrays only
+    close = np.require(close, np.float64, ['C', 'W'])
+    return _build_features(close, rsi_window, ema_window, sma_short_window,
+                           sma_long_window, bb_window, float(bb_std))
+
+
+__all__ = ['build_features', 'FEATURE_VERSION']
@@ -0,0 +1,19 @@
+"""
+Numba JIT decorator with a pure-Python fallback.
+
+If numba is not installed, ``njit`` becomes a no-op decorator so the
+decorated functions still run (slower) as regular Python.
+"""
+try:
+    from numba import njit
+except ImportError:
+    def njit(_func=None, *args, **kwargs):
+        def decorator(func):
+            return func
+
+        if callable(_func):
+            return decorator(_func)
+        return decorator
+
+
+__all__ = ['njit']
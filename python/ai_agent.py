@@ -6,7 +6,9 @@ from crewai_tools import SerperDevTool, ScrapeWebsiteTool,WebsiteSearchTool
 from typing import List
 from dotenv import load_dotenv
 import os
+import logging
 import warnings
+import requests_cache
 # warnings.filterwarnings("ignore")
 
 # Load environment variables
@@ -14,6 +16,11 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini/gemini-2.0-flash")
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+# Verbose agent/crew logging is opt-in (set CREW_VERBOSE=1)
+CREW_VERBOSE = os.getenv("CREW_VERBOSE", "").strip().lower() in ("1", "true", "yes")
+
+# Agent steps are only formatted and logged when DEBUG logging is enabled
+step_logger = logging.getLogger("crew.steps")
 
 # Create LLM with temperature 0 for consistent outputs
 gemini_llm = LLM(
@@ -23,6 +30,10 @@ gemini_llm = LLM(
     max_tokens=2048
 )
 
+# Cache HTTP GETs made through requests (ScrapeWebsiteTool) in a local
+# sqlite file so pages revisited across agents/steps are served from disk
+requests_cache.install_cache('crew_cache', backend='sqlite', expire_after=3600)
+
 # Initialize tools
 scrape_tool = ScrapeWebsiteTool()
 search_tool = SerperDevTool(
@@ -63,12 +74,12 @@ class CryptoNewsResearcher():
     def crypto_news_researcher(self) -> Agent:
         return Agent(
             config=self.agents_config["crypto_news_researcher"],
-            verbose=True,
+            verbose=CREW_VERBOSE,
             llm=gemini_llm,
             tools=[search_tool, scrape_tool],
             max_rpm=2,
             max_retry_limit=3, 
-            step_callback=lambda step: print(f"Agent step: {step}")
+            step_callback=step_logger.debug if step_logger.isEnabledFor(logging.DEBUG) else None
         )
 
     @task
@@ -86,7 +97,7 @@ class CryptoNewsResearcher():
             agents=self.agents,
             tasks=self.tasks,
             process=Process.sequential,
-            verbose=True,
+            verbose=CREW_VERBOSE,
             max_rpm=3,
             language="en"
         )
@@ -0,0 +1,36 @@
+"""
+Ahead-of-time compile the numba kernels in _kernels.py.
+
+Run once after installing the requirements (``python python/build_kernels.py``)
+to build the ``_kernels_aot`` extension next to this file. _kernels then loads
+the compiled functions directly, so short-lived prediction processes skip
+JIT compilation entirely. The extension also exports source_hash(), and
+_kernels falls back to JIT compilation when it doesn't match the current
+source, so rerun this script after editing _kernels.py.
+"""
+import os
+import sys
+
+from numba.pycc import CC
+
+# Always import the pure-Python kernels, even if an older build exists
+sys.modules['_kernels_aot'] = None
+import _kernels
+
+
+def source_hash():
+    return _kernels.SOURCE_HASH
+
+
+def main():
+    cc = CC('_kernels_aot')
+    cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+    cc.export('source_hash', 'int64()')(source_hash)
+    for name, signature in _kernels.SIGNATURES.items():
+        cc.export(name, signature)(getattr(_kernels, name).py_func)
+    cc.compile()
+    print(f"Compiled {', '.join(_kernels.SIGNATURES)} to {cc.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
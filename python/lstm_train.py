@@ -1,19 +1,24 @@
+from __future__ import annotations
+
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-import matplotlib.pyplot as plt
-import seaborn as sns
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
-from tensorflow.keras.losses import Huber
 from datetime import datetime, timedelta
-import joblib
+from functools import lru_cache
+import glob
+import hashlib
 import warnings
 import json
 import os
-from typing import Tuple, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Tuple, List, Dict, Any
+
+from _kernels import FEATURE_VERSION, build_features
+
+# TensorFlow and matplotlib are imported inside the functions that need
+# them, so importing this module for its feature helpers stays cheap
+if TYPE_CHECKING:
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
 
 warnings.filterwarnings('ignore')
 
@@ -23,6 +28,7 @@ warnings.filterwarnings('ignore')
 HYPERPARAMS = {
     'sequence_length': 30,
     'batch_size': 32,
+    'predict_batch_size': 256,
     'epochs': 100,
     'patience_early_stop': 10,
     'patience_lr_reduce': 5,
@@ -32,7 +38,10 @@ HYPERPARAMS = {
     'lstm_units_2': 32,
     'dropout_rate': 0.2,
     'learning_rate_factor': 0.5,
-    'min_learning_rate': 1e-7
+    'min_learning_rate': 1e-7,
+    # XLA cannot compile the fused cuDNN LSTM kernel and is slower than the
+    # default LSTM kernel on CPU, so it is opt-in
+    'jit_compile': False
 }
 
 # Technical indicator calculation parameters
@@ -45,72 +54,51 @@ TECH_PARAMS = {
     'bollinger_std': 2
 }
 
-
-def calculate_rsi(prices: pd.Series, window: int = 14) -> pd.Series:
-    """
-    Calculate Relative Strength Index momentum oscillator.
-    
-    Args:
-        prices: Price series
-        window: Period for RSI calculation
-        
-    Returns:
-        RSI values as pandas Series
-    """
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+# Leading rows without a value for every indicator (longest window - 1)
+FEATURE_WARMUP = max(TECH_PARAMS['rsi_window'], TECH_PARAMS['ema_window'],
+                     TECH_PARAMS['sma_10_window'], TECH_PARAMS['sma_50_window'],
+                     TECH_PARAMS['bollinger_window']) - 1
 
 
-def calculate_ema(prices: pd.Series, window: int = 30) -> pd.Series:
+def build_feature_matrix(close: np.ndarray) -> np.ndarray:
     """
-    Calculate Exponential Moving Average with exponentially decreasing weights.
+    Calculate all features for TECH_PARAMS in one fused pass over the prices.
     
     Args:
-        prices: Price series
-        window: Period for EMA calculation
+        close: Close prices
         
     Returns:
-        EMA values as pandas Series
-    """
-    return prices.ewm(span=window, adjust=False).mean()
+        float32 array of shape (len(close), 11), warm-up rows included
+    """
+    return build_features(
+        np.ascontiguousarray(close, dtype=np.float64),
+        TECH_PARAMS['rsi_window'],
+        TECH_PARAMS['ema_window'],
+        TECH_PARAMS['sma_10_window'],
+        TECH_PARAMS['sma_50_window'],
+        TECH_PARAMS['bollinger_window'],
+        float(TECH_PARAMS['bollinger_std'])
+    )
 
 
-def calculate_sma(prices: pd.Series, window: int) -> pd.Series:
+def trim_feature_rows(feature_matrix: np.ndarray) -> np.ndarray:
     """
-    Calculate Simple Moving Average as arithmetic mean.
+    Drop the warm-up rows and any later rows with NaN features.
     
-    Args:
-        prices: Price series
-        window: Period for SMA calculation
-        
-    Returns:
-        SMA values as pandas Series
-    """
-    return prices.rolling(window=window).mean()
-
-
-def calculate_bollinger_bands(prices: pd.Series, window: int = 20, 
-                            num_std: int = 2) -> Tuple[pd.Series, pd.Series]:
-    """
-    Calculate Bollinger Bands volatility indicator.
+    Flat price stretches give 0/0 RSI values after the warm-up; those rows
+    are removed so the model never sees NaN inputs.
     
     Args:
-        prices: Price series
-        window: Period for moving average calculation
-        num_std: Number of standard deviations for band width
+        feature_matrix: Output of build_feature_matrix
         
     Returns:
-        Tuple of (upper_band, lower_band)
+        Feature rows without NaN values
     """
-    sma = prices.rolling(window=window).mean()
-    std = prices.rolling(window=window).std()
-    upper_band = sma + (std * num_std)
-    lower_band = sma - (std * num_std)
-    return upper_band, lower_band
+    feature_matrix = feature_matrix[FEATURE_WARMUP:]
+    valid = ~np.isnan(feature_matrix).any(axis=1)
+    if not valid.all():
+        feature_matrix = feature_matrix[valid]
+    return feature_matrix
 
 
 def load_and_prepare_data(csv_file: str) -> pd.DataFrame:
@@ -138,6 +126,10 @@ def load_and_prepare_data(csv_file: str) -> pd.DataFrame:
     # Parse date column for time series analysis
     df['date'] = pd.to_datetime(df['date'])
     
+    # Keep prices in float32, the precision the model trains in
+    for col in df.select_dtypes('float64').columns:
+        df[col] = df[col].astype(np.float32)
+    
     # Sort chronologically for time series modeling
     df = df.sort_values('date').reset_index(drop=True)
     
@@ -166,27 +158,6 @@ def engineer_features(df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
     Returns:
         Tuple of (feature_array, feature_names)
     """
-    # Calculate momentum and trend indicators
-    df['rsi_14'] = calculate_rsi(df['close'], window=TECH_PARAMS['rsi_window'])
-    df['ema_30'] = calculate_ema(df['close'], window=TECH_PARAMS['ema_window'])
-    df['sma_10'] = calculate_sma(df['close'], window=TECH_PARAMS['sma_10_window'])
-    df['sma_50'] = calculate_sma(df['close'], window=TECH_PARAMS['sma_50_window'])
-    
-    # Calculate volatility indicators
-    bb_upper, bb_lower = calculate_bollinger_bands(
-        df['close'], 
-        window=TECH_PARAMS['bollinger_window'],
-        num_std=TECH_PARAMS['bollinger_std']
-    )
-    df['bb_upper'] = bb_upper
-    df['bb_lower'] = bb_lower
-    
-    # Create derived features for better price pattern recognition
-    df['bb_width'] = df['bb_upper'] - df['bb_lower']  # Market volatility measure
-    df['bb_position'] = (df['close'] - df['bb_lower']) / df['bb_width']  # Price position in bands
-    df['price_sma10_ratio'] = df['close'] / df['sma_10']  # Short-term trend strength
-    df['price_sma50_ratio'] = df['close'] / df['sma_50']  # Long-term trend strength
-    
     # Select feature set for model training
     features = [
         'close', 'rsi_14', 'ema_30', 'sma_10', 'sma_50',
@@ -194,44 +165,108 @@ def engineer_features(df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
         'price_sma10_ratio', 'price_sma50_ratio'
     ]
     
-    # Remove rows with NaN values from rolling calculations
-    df_features = df[features].dropna().reset_index(drop=True)
+    # Calculate momentum, trend and volatility indicators plus derived
+    # band/trend-strength features in one fused pass over the close prices,
+    # then drop the warm-up and any NaN rows
+    feature_matrix = trim_feature_rows(build_feature_matrix(df['close'].values))
     
     # Verify sufficient feature data for model training
-    if len(df_features) < 100:
-        raise Exception(f"Insufficient feature data: only {len(df_features)} records "
+    if len(feature_matrix) < 100:
+        raise Exception(f"Insufficient feature data: only {len(feature_matrix)} records "
                        f"after feature engineering. Need at least 100 records.")
     
-    print(f"Features engineered: {df_features.shape}")
+    print(f"Features engineered: {feature_matrix.shape}")
     print(f"Features: {features}")
     
-    return df_features.values, features
+    return np.ascontiguousarray(feature_matrix, dtype=np.float32), features
 
 
-def normalize_features(data: np.ndarray, feature_names: List[str]) -> Tuple[np.ndarray, Dict[str, MinMaxScaler]]:
+def load_or_engineer_features(csv_file: str, 
+                              df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
     """
-    Apply individual normalization to each feature for optimal LSTM training.
+    Load engineered features from a Parquet cache, computing them on a miss.
+    
+    The cache file sits next to the CSV and is keyed by the CSV modification
+    time, TECH_PARAMS and the kernel's FEATURE_VERSION, so changing any of
+    them invalidates it. Superseded cache files are removed on a miss.
     
     Args:
-        data: Raw feature array
-        feature_names: List of feature names
+        csv_file: Path to the source price CSV file
+        df: Prepared DataFrame loaded from csv_file
         
     Returns:
-        Tuple of (scaled_data, scalers_dict)
+        Tuple of (feature_array, feature_names)
+    """
+    key_source = f"{FEATURE_VERSION}{TECH_PARAMS}{os.path.getmtime(csv_file)}"
+    key = hashlib.md5(key_source.encode()).hexdigest()
+    cache_prefix = f"{os.path.splitext(csv_file)[0]}_features_"
+    cache_file = f"{cache_prefix}{key}.parquet"
+    
+    if os.path.exists(cache_file):
+        df_features = pd.read_parquet(cache_file, engine='pyarrow')
+        print(f"Features loaded from cache: {cache_file} {df_features.shape}")
+        return df_features.values.astype(np.float32, copy=False), list(df_features.columns)
+    
+    feature_data, feature_names = engineer_features(df)
+    pd.DataFrame(feature_data, columns=feature_names).to_parquet(
+        cache_file, engine='pyarrow', compression='zstd', index=False
+    )
+    
+    # Drop caches written for an older CSV, TECH_PARAMS or feature version
+    for stale_file in glob.glob(f"{glob.escape(cache_prefix)}*.parquet"):
+        if stale_file != cache_file:
+            os.remove(stale_file)
+    
+    return feature_data, feature_names
+
+
+def normalize_features(data: np.ndarray, feature_names: List[str]) -> Tuple[np.ndarray, Dict[str, Any]]:
     """
-    scalers = {}
-    scaled_data = np.zeros_like(data)
+    Apply individual min-max normalization to each feature for optimal LSTM training.
     
-    for i, feature_name in enumerate(feature_names):
-        scaler = MinMaxScaler(feature_range=(0, 1))
-        scaled_data[:, i] = scaler.fit_transform(data[:, i].reshape(-1, 1)).flatten()
-        scalers[feature_name] = scaler
+    Args:
+        data: Raw feature array
+        feature_names: List of feature names
+        
+    Returns:
+        Tuple of (scaled_data, scalers_dict) where scalers_dict holds the
+        per-feature 'mins' and 'scales' (max - min) arrays and the
+        feature name to column 'index' mapping
+    """
+    # Scale all columns in one broadcast instead of one scaler per feature
+    data = data.astype(np.float32, copy=False)
+    mins = data.min(axis=0)
+    ranges = data.max(axis=0) - mins
+    ranges[ranges == 0] = 1.0  # Constant features map to 0, as in MinMaxScaler
+    scaled_data = (data - mins) / ranges
+    
+    scalers = {
+        'mins': mins,
+        'scales': ranges,
+        'index': {feature_name: i for i, feature_name in enumerate(feature_names)}
+    }
     
     print(f"Applied individual scaling to {len(feature_names)} features")
     
     return scaled_data, scalers
 
 
+def inverse_transform_close(values: np.ndarray, 
+                            scalers: Dict[str, Any]) -> np.ndarray:
+    """
+    Convert normalized close prices back to the actual price scale.
+    
+    Args:
+        values: Normalized close price values
+        scalers: Feature normalization scalers
+        
+    Returns:
+        Close prices in the original price scale
+    """
+    close = scalers['index']['close']
+    return np.asarray(values, dtype=np.float64) * scalers['scales'][close] + scalers['mins'][close]
+
+
 def create_sequences(data: np.ndarray, sequence_length: int, 
                     target_column: int = 0) -> Tuple[np.ndarray, np.ndarray]:
     """
@@ -245,50 +280,123 @@ def create_sequences(data: np.ndarray, sequence_length: int,
     Returns:
         Tuple of (X, y) arrays for supervised learning
     """
-    X, y = [], []
-    for i in range(sequence_length, len(data)):
-        # Input: historical sequence of all features
-        X.append(data[i-sequence_length:i, :])
-        # Target: next period's close price
-        y.append(data[i, target_column])
-    
-    return np.array(X), np.array(y)
+    # Input: zero-copy view of every historical window of all features
+    X = np.lib.stride_tricks.sliding_window_view(
+        data[:-1], (sequence_length, data.shape[1])
+    ).squeeze(1)
+    # Target: next period's close price
+    y = data[sequence_length:, target_column].copy()
+
+    return X, y
 
 
-def build_enhanced_lstm_model(input_shape: Tuple[int, int]) -> Sequential:
+def window_dataset(data: np.ndarray, sequence_length: int, start: int, stop: int,
+                   batch_size: int, shuffle: bool = False, target_column: int = 0):
+    """
+    Build a batched tf.data pipeline over the sequences starting in [start, stop).
+
+    Windows are sliced from the 2-D feature array on demand, so the dense
+    (samples, sequence_length, features) array is never materialized.
+
+    Args:
+        data: Normalized feature data
+        sequence_length: Number of previous time steps to use as input
+        start: Index of the first sequence (as returned by create_sequences)
+        stop: Index one past the last sequence
+        batch_size: Sequences per batch
+        shuffle: Shuffle sequence order each epoch
+        target_column: Index of target column (close price)
+
+    Returns:
+        Prefetching tf.data.Dataset of (window, next close) batches
+    """
+    import tensorflow as tf
+
+    features = tf.constant(data)
+    ds = tf.data.Dataset.range(start, stop)
+    if shuffle:
+        ds = ds.shuffle(stop - start)
+    ds = ds.map(
+        lambda i: (features[i:i + sequence_length],
+                   features[i + sequence_length, target_column]),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def build_enhanced_lstm_model(input_shape: Tuple[int, int],
+                              hyperparams: Dict[str, Any] | None = None) -> Sequential:
     """
     Build LSTM neural network with dropout regularization for price prediction.
     
     Args:
         input_shape: Shape of input sequences (sequence_length, n_features)
+        hyperparams: Hyperparameters overriding HYPERPARAMS, e.g. the ones
+            saved in a trained model's config file
         
     Returns:
         Compiled Keras LSTM model
     """
+    import tensorflow as tf
+    from tensorflow.keras import mixed_precision
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+    from tensorflow.keras.losses import Huber
+    
+    # Run on FP16 tensor cores when a GPU is present (float16 is slower on CPU)
+    if tf.config.list_physical_devices('GPU'):
+        mixed_precision.set_global_policy('mixed_float16')
+    
+    params = {**HYPERPARAMS, **(hyperparams or {})}
     model = Sequential()
     
+    # LSTM settings required for the fused cuDNN kernel; regularization is
+    # applied by Dropout layers between LSTMs, not by recurrent dropout
+    cudnn_lstm_args = dict(
+        activation='tanh',
+        recurrent_activation='sigmoid',
+        recurrent_dropout=0,
+        unroll=False,
+        use_bias=True
+    )
+    
     # Primary LSTM layer for sequence pattern learning
     model.add(LSTM(
-        HYPERPARAMS['lstm_units_1'], 
+        params['lstm_units_1'], 
         return_sequences=True, 
         input_shape=input_shape,
-        name='lstm_1'
+        name='lstm_1',
+        **cudnn_lstm_args
     ))
-    model.add(Dropout(HYPERPARAMS['dropout_rate'], name='dropout_1'))
+    model.add(Dropout(params['dropout_rate'], name='dropout_1'))
     
     # Secondary LSTM layer for higher-level pattern extraction
-    model.add(LSTM(HYPERPARAMS['lstm_units_2'], name='lstm_2'))
-    model.add(Dropout(HYPERPARAMS['dropout_rate'], name='dropout_2'))
+    model.add(LSTM(params['lstm_units_2'], name='lstm_2', **cudnn_lstm_args))
+    model.add(Dropout(params['dropout_rate'], name='dropout_2'))
     
-    # Output layer for price prediction
-    model.add(Dense(1, name='output'))
+    # Output layer for price prediction, kept in float32 for a stable loss
+    model.add(Dense(1, name='output', dtype='float32'))
     
     # Use Huber loss for robustness to outliers
-    model.compile(optimizer='adam', loss=Huber(), metrics=['mae'])
+    model.compile(optimizer='adam', loss=Huber(), metrics=['mae'],
+                  jit_compile=params['jit_compile'])
     
     return model
 
 
+def _pyplot():
+    """
+    Import pyplot with the headless Agg backend on first use.
+    
+    Returns:
+        The matplotlib.pyplot module
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # Headless backend: plots are only written to files
+    import matplotlib.pyplot as plt
+    return plt
+
+
 def plot_enhanced_results(actual: np.ndarray, predicted: np.ndarray, 
                          save_dir: str) -> None:
     """
@@ -299,11 +407,13 @@ def plot_enhanced_results(actual: np.ndarray, predicted: np.ndarray,
         predicted: Model predicted prices
         save_dir: Directory to save plot files
     """
+    plt = _pyplot()
+    
     # Create output directory for plots
     os.makedirs(save_dir, exist_ok=True)
     
     # Time series comparison plot
-    plt.figure(figsize=(15, 8))
+    fig = plt.figure(figsize=(15, 8))
     plt.plot(actual, label='Actual Prices', color='blue', linewidth=2, alpha=0.7)
     plt.plot(predicted, label='Predicted Prices', color='red', linewidth=2, alpha=0.7)
     plt.title('Actual vs Predicted Bitcoin Prices', fontsize=16, fontweight='bold')
@@ -312,12 +422,13 @@ def plot_enhanced_results(actual: np.ndarray, predicted: np.ndarray,
     plt.legend(fontsize=12)
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.savefig(f"{save_dir}/price_comparison.png", dpi=300, bbox_inches='tight')
-    plt.show()
+    fig.savefig(f"{save_dir}/price_comparison.png", dpi=300, bbox_inches='tight')
+    plt.close(fig)
     
-    # Prediction accuracy scatter plot
-    plt.figure(figsize=(10, 8))
-    plt.scatter(actual, predicted, alpha=0.6, color='purple', s=20)
+    # Prediction accuracy density plot; hexbin cost scales with bins, not points
+    fig = plt.figure(figsize=(10, 8))
+    hexbins = plt.hexbin(actual, predicted, gridsize=50, cmap='Purples', mincnt=1)
+    plt.colorbar(hexbins, label='Count')
     
     # Perfect prediction reference line
     min_price = min(actual.min(), predicted.min())
@@ -327,7 +438,7 @@ def plot_enhanced_results(actual: np.ndarray, predicted: np.ndarray,
     
     plt.xlabel('Actual Prices (USD)', fontsize=12)
     plt.ylabel('Predicted Prices (USD)', fontsize=12)
-    plt.title('Actual vs Predicted Prices Scatter Plot', fontsize=14, fontweight='bold')
+    plt.title('Actual vs Predicted Prices Density Plot', fontsize=14, fontweight='bold')
     plt.legend()
     plt.grid(True, alpha=0.3)
     
@@ -339,8 +450,8 @@ def plot_enhanced_results(actual: np.ndarray, predicted: np.ndarray,
              bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
     
     plt.tight_layout()
-    plt.savefig(f"{save_dir}/scatter_plot.png", dpi=300, bbox_inches='tight')
-    plt.show()
+    fig.savefig(f"{save_dir}/scatter_plot.png", dpi=300, bbox_inches='tight')
+    plt.close(fig)
 
 
 def plot_training_history(history: tf.keras.callbacks.History, 
@@ -352,9 +463,10 @@ def plot_training_history(history: tf.keras.callbacks.History,
         history: Keras training history object
         save_dir: Directory to save training plots
     """
+    plt = _pyplot()
     os.makedirs(save_dir, exist_ok=True)
     
-    plt.figure(figsize=(15, 5))
+    fig = plt.figure(figsize=(15, 5))
     
     # Training and validation loss progression
     plt.subplot(1, 2, 1)
@@ -377,8 +489,8 @@ def plot_training_history(history: tf.keras.callbacks.History,
     plt.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig(f"{save_dir}/training_history.png", dpi=300, bbox_inches='tight')
-    plt.show()
+    fig.savefig(f"{save_dir}/training_history.png", dpi=300, bbox_inches='tight')
+    plt.close(fig)
 
 
 def save_training_history(history: tf.keras.callbacks.History, 
@@ -419,20 +531,22 @@ def calculate_metrics(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, fl
     Returns:
         Dictionary of performance metrics
     """
-    mse = np.mean((actual - predicted) ** 2)
-    mae = np.mean(np.abs(actual - predicted))
+    # Reuse residuals and their squares across all error metrics
+    residual = actual - predicted
+    squared_residual = residual * residual
+    
+    mse = squared_residual.mean()
+    mae = np.abs(residual).mean()
     rmse = np.sqrt(mse)
-    mape = np.mean(np.abs((actual - predicted) / actual)) * 100
+    mape = np.mean(np.abs(residual / actual)) * 100
     
     # Coefficient of determination
-    ss_res = np.sum((actual - predicted) ** 2)
-    ss_tot = np.sum((actual - np.mean(actual)) ** 2)
+    ss_res = squared_residual.sum()
+    ss_tot = np.sum((actual - actual.mean()) ** 2)
     r2 = 1 - (ss_res / ss_tot)
     
-    # Direction prediction accuracy
-    actual_direction = np.diff(actual) > 0
-    predicted_direction = np.diff(predicted) > 0
-    directional_accuracy = np.mean(actual_direction == predicted_direction) * 100
+    # Direction prediction accuracy: directions agree unless exactly one rose
+    directional_accuracy = np.mean(~((np.diff(actual) > 0) ^ (np.diff(predicted) > 0))) * 100
     
     return {
         'mse': mse,
@@ -444,7 +558,19 @@ def calculate_metrics(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, fl
     }
 
 
-def train_enhanced_lstm_model(csv_file: str) -> Tuple[Sequential, Dict[str, MinMaxScaler], 
+def _write_json(data: Dict[str, Any], filename: str) -> None:
+    """
+    Write a dictionary to a JSON file.
+    
+    Args:
+        data: JSON-serializable dictionary
+        filename: Output file path
+    """
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def train_enhanced_lstm_model(csv_file: str) -> Tuple[Sequential, Dict[str, Any], 
                                                     np.ndarray, List[str]]:
     """
     Complete pipeline for training LSTM Bitcoin price prediction model.
@@ -470,7 +596,7 @@ def train_enhanced_lstm_model(csv_file: str) -> Tuple[Sequential, Dict[str, MinM
     
     # Calculate technical indicators for feature engineering
     print("Step 2: Engineering technical analysis features...")
-    feature_data, feature_names = engineer_features(df)
+    feature_data, feature_names = load_or_engineer_features(csv_file, df)
     
     # Normalize features for optimal neural network training
     print("Step 3: Normalizing features for neural network...")
@@ -499,6 +625,8 @@ def train_enhanced_lstm_model(csv_file: str) -> Tuple[Sequential, Dict[str, MinM
     print("Model architecture:")
     model.summary()
     
+    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+    
     # Setup training callbacks for optimization
     early_stopping = EarlyStopping(
         monitor='val_loss',
@@ -515,13 +643,22 @@ def train_enhanced_lstm_model(csv_file: str) -> Tuple[Sequential, Dict[str, MinM
         verbose=1
     )
     
+    # Hold out the most recent training samples for validation
+    split_at = int(len(X_train) * (1 - HYPERPARAMS['validation_split']))
+    
+    # Prefetching input pipelines slice windows lazily from the 2-D scaled data
+    seq_len = HYPERPARAMS['sequence_length']
+    train_ds = window_dataset(scaled_data, seq_len, 0, split_at,
+                              HYPERPARAMS['batch_size'], shuffle=True)
+    val_ds = window_dataset(scaled_data, seq_len, split_at, train_size,
+                            HYPERPARAMS['batch_size'])
+    
     # Train LSTM model on Bitcoin price sequences
     print("Step 7: Training LSTM model...")
     history = model.fit(
-        X_train, y_train,
+        train_ds,
         epochs=HYPERPARAMS['epochs'],
-        batch_size=HYPERPARAMS['batch_size'],
-        validation_split=HYPERPARAMS['validation_split'],
+        validation_data=val_ds,
         callbacks=[early_stopping, reduce_lr],
         verbose=1
     )
@@ -532,12 +669,13 @@ def train_enhanced_lstm_model(csv_file: str) -> Tuple[Sequential, Dict[str, MinM
     
     # Generate predictions on test set
     print("Step 8: Generating price predictions...")
-    test_predictions = model.predict(X_test, verbose=0)
+    test_ds = window_dataset(scaled_data, seq_len, train_size, len(X),
+                             HYPERPARAMS['predict_batch_size'])
+    test_predictions = model.predict(test_ds, verbose=0)
     
     # Convert normalized predictions back to actual price scale
-    close_scaler = scalers['close']
-    test_predictions_scaled = close_scaler.inverse_transform(test_predictions).flatten()
-    y_test_actual = close_scaler.inverse_transform(y_test.reshape(-1, 1)).flatten()
+    test_predictions_scaled = inverse_transform_close(test_predictions.flatten(), scalers)
+    y_test_actual = inverse_transform_close(y_test, scalers)
     
     # Evaluate model performance with multiple metrics
     print("Step 9: Evaluating model performance...")
@@ -562,18 +700,12 @@ def train_enhanced_lstm_model(csv_file: str) -> Tuple[Sequential, Dict[str, MinM
     # Save trained model and preprocessing components
     print("Step 11: Saving trained model and scalers...")
     model_filename = f"{model_dir}/lstm_model.keras"
-    scalers_filename = f"{model_dir}/scalers.joblib"
+    weights_filename = f"{model_dir}/lstm.weights.h5"
+    scalers_filename = f"{model_dir}/scalers.npz"
     scaled_data_filename = f"{model_dir}/scaled_data.npy"
+    config_filename = f"{model_dir}/config.json"
     
-    model.save(model_filename)
-    joblib.dump(scalers, scalers_filename)
-    np.save(scaled_data_filename, scaled_data)
-    
-    print(f"Model saved as: {model_filename}")
-    print(f"Scalers saved as: {scalers_filename}")
-    print(f"Scaled data saved as: {scaled_data_filename}")
-    
-    # Save model configuration and performance metrics
+    # Model configuration and performance metrics
     config = {
         'feature_names': feature_names,
         'hyperparameters': HYPERPARAMS,
@@ -581,16 +713,35 @@ def train_enhanced_lstm_model(csv_file: str) -> Tuple[Sequential, Dict[str, MinM
         'metrics': metrics
     }
     
-    config_filename = f"{model_dir}/config.json"
-    with open(config_filename, 'w') as f:
-        json.dump(config, f, indent=2)
+    # Write the numpy/json artifacts in the background while this thread
+    # saves the model; both model writes walk the same Keras variables, so
+    # they stay on one thread, in order (weights last, so their mtime is at
+    # least the .keras file's)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(np.save, scaled_data_filename, scaled_data),
+            executor.submit(_write_json, config, config_filename),
+        ]
+        model.save(model_filename)
+        model.save_weights(weights_filename)
+        for future in futures:
+            future.result()
+    
+    # Scalers go last: prediction only trusts a scalers file at least as new
+    # as the model and config it is paired with
+    np.savez(scalers_filename, mins=scalers['mins'], scales=scalers['scales'],
+             feature_names=np.array(feature_names))
     
+    print(f"Model saved as: {model_filename}")
+    print(f"Weights saved as: {weights_filename}")
+    print(f"Scalers saved as: {scalers_filename}")
+    print(f"Scaled data saved as: {scaled_data_filename}")
     print(f"Configuration saved as: {config_filename}")
     
     return model, scalers, scaled_data, feature_names
 
 
-def predict_next_day(model: Sequential, scalers: Dict[str, MinMaxScaler], 
+def predict_next_day(model: Sequential, scalers: Dict[str, Any], 
                     scaled_data: np.ndarray, sequence_length: int = None) -> float:
     """
     Predict next day's Bitcoin closing price using trained LSTM model.
@@ -614,13 +765,54 @@ def predict_next_day(model: Sequential, scalers: Dict[str, MinMaxScaler],
     next_day_prediction = model.predict(last_sequence, verbose=0)
     
     # Convert normalized prediction back to actual price
-    close_scaler = scalers['close']
-    next_day_price = close_scaler.inverse_transform(next_day_prediction)[0, 0]
+    next_day_price = inverse_transform_close(next_day_prediction[0, 0], scalers)
     
     return next_day_price
 
 
-def predict_multi_step(model: Sequential, scalers: Dict[str, MinMaxScaler], 
+@lru_cache(maxsize=None)
+def _build_rollout():
+    """
+    Build the in-graph multi-step forecast, importing TensorFlow on first use.
+    
+    The returned tf.function feeds each prediction back into the input
+    window inside a tf.while_loop. It is traced once per model and sequence
+    shape, so a whole forecast costs a single Python-to-TensorFlow call
+    instead of one predict() per day. Tensors are immutable, so each day
+    builds the shifted window with one concat; a scatter-updated ring buffer
+    would copy the window as well and then need a gather to reorder it.
+    
+    Returns:
+        tf.function taking (model, sequence, num_days) and returning the
+        normalized close price predictions of shape (num_days,)
+    """
+    import tensorflow as tf
+    
+    @tf.function
+    def rollout(model: Sequential, sequence: tf.Tensor, num_days: tf.Tensor) -> tf.Tensor:
+        predictions = tf.TensorArray(tf.float32, size=num_days)
+        
+        def cond(i, current_sequence, predictions):
+            return i < num_days
+        
+        def body(i, current_sequence, predictions):
+            # Generate next day prediction
+            next_prediction = tf.cast(model(current_sequence[tf.newaxis], training=False)[0, 0], tf.float32)
+            
+            # Update close price of the latest row with the prediction
+            new_row = tf.concat([[next_prediction], current_sequence[-1, 1:]], axis=0)
+            
+            # Shift sequence window forward
+            current_sequence = tf.concat([current_sequence[1:], new_row[tf.newaxis]], axis=0)
+            return i + 1, current_sequence, predictions.write(i, next_prediction)
+        
+        _, _, predictions = tf.while_loop(cond, body, (tf.constant(0), sequence, predictions))
+        return predictions.stack()
+    
+    return rollout
+
+
+def predict_multi_step(model: Sequential, scalers: Dict[str, Any], 
                       scaled_data: np.ndarray, num_days: int = 7, 
                       sequence_length: int = None) -> np.ndarray:
     """
@@ -639,37 +831,32 @@ def predict_multi_step(model: Sequential, scalers: Dict[str, MinMaxScaler],
     if sequence_length is None:
         sequence_length = HYPERPARAMS['sequence_length']
     
-    predictions = []
-    current_sequence = scaled_data[-sequence_length:].copy()
+    import tensorflow as tf
     
-    for i in range(num_days):
-        # Prepare sequence for prediction
-        sequence_input = current_sequence.reshape(1, sequence_length, scaled_data.shape[1])
-        
-        # Generate next day prediction
-        next_prediction = model.predict(sequence_input, verbose=0)[0, 0]
-        
-        # Store prediction for output
-        predictions.append(next_prediction)
-        
-        # Update sequence with new prediction for next iteration
-        new_row = current_sequence[-1].copy()
-        new_row[0] = next_prediction  # Update close price with prediction
-        
-        # Shift sequence window forward
-        current_sequence = np.vstack([current_sequence[1:], new_row])
+    # Run the whole forecast recurrence inside a single graph call
+    current_sequence = tf.convert_to_tensor(scaled_data[-sequence_length:], dtype=tf.float32)
+    predictions = _build_rollout()(model, current_sequence, tf.constant(num_days)).numpy()
     
     # Convert normalized predictions to actual price scale
-    close_scaler = scalers['close']
-    predicted_prices = close_scaler.inverse_transform(np.array(predictions).reshape(-1, 1)).flatten()
+    predicted_prices = inverse_transform_close(predictions, scalers)
     
     return predicted_prices
 
 
 if __name__ == "__main__":
-    # Set random seeds for reproducible results
-    np.random.seed(42)
-    tf.random.set_seed(42)
+    import tensorflow as tf
+    
+    # Seed for repeatable runs; bit-exact determinism disables the fastest
+    # cuDNN kernels, so it is opt-in via SOMNIA_DETERMINISTIC
+    if os.getenv('SOMNIA_DETERMINISTIC'):
+        tf.keras.utils.set_random_seed(42)
+        tf.config.experimental.enable_op_determinism()
+    else:
+        np.random.seed(42)
+        tf.random.set_seed(42)
+    
+    # Let TensorFlow size its inter-op thread pool automatically
+    tf.config.threading.set_inter_op_parallelism_threads(0)
     
     try:
         # Execute complete model training pipeline
@@ -693,7 +880,8 @@ if __name__ == "__main__":
         print("\nLSTM model training completed successfully!")
         print("\nGenerated files:")
         print(f"- lstm_model.keras (trained LSTM model)")
-        print(f"- scalers.joblib (feature normalization scalers)")
+        print(f"- lstm.weights.h5 (inference-only model weights)")
+        print(f"- scalers.npz (feature normalization scalers)")
         print(f"- config.json (model configuration and metrics)")
         print(f"- training_history.json (training performance data)")
         print(f"- Visualization plots in python/plots/ directory")
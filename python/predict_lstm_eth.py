@@ -3,17 +3,75 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import tensorflow as tf
 from tensorflow.keras.models import load_model
 from datetime import timedelta
 import joblib
 import json
+from lstm_train_eth import (TECH_PARAMS, FEATURE_WARMUP, build_enhanced_lstm_model,
+                        build_feature_matrix, trim_feature_rows)
 
-# Load model
-model = load_model("python/models/lstm_eth_model.keras")
+def write_atomic(path, write):
+    """
+    Ghi qua file tạm cùng thư mục rồi os.replace, để tiến trình dự đoán chạy
+    song song không bao giờ đọc phải file đang ghi dở
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def is_fresh(path, *sources):
+    """
+    File tồn tại và không cũ hơn file nào (đang tồn tại) trong sources
+    """
+    if not os.path.exists(path):
+        return False
+    mtime = os.path.getmtime(path)
+    return all(mtime >= os.path.getmtime(src) for src in sources if os.path.exists(src))
+
+# Load scalers (per-feature mins/scales arrays)
+def load_scalers(npz_path, joblib_path, cache_path, paired_paths):
+    """
+    Đọc scalers dạng mảng từ file .npz do script train ghi, chỉ khi file đó
+    không cũ hơn model/config đi cùng (paired_paths). Nếu không, dùng các
+    MinMaxScaler trong file joblib cũ; bản chuyển đổi được lưu ở cache_path
+    để các lần chạy sau không phải unpickle (và import) sklearn
+    """
+    if is_fresh(npz_path, *paired_paths):
+        path = npz_path
+    elif is_fresh(cache_path, joblib_path):
+        path = cache_path
+    else:
+        path = None
+    if path is not None:
+        data = np.load(path)
+        names = data['feature_names'].tolist()
+        mins, scales = data['mins'], data['scales']
+    else:
+        legacy = joblib.load(joblib_path)
+        names = list(legacy)
+        mins = np.array([legacy[name].data_min_[0] for name in names])
+        scales = np.array([1.0 / legacy[name].scale_[0] for name in names])
+        try:
+            write_atomic(cache_path, lambda f: np.savez(f, mins=mins, scales=scales,
+                                                        feature_names=np.array(names)))
+        except OSError:
+            pass  # Thư mục chỉ đọc: lần sau vẫn dùng file joblib
+    return {'mins': mins, 'scales': scales, 'index': {name: i for i, name in enumerate(names)}}
 
-# Load scalers (dictionary)
-scalers = joblib.load("python/models/scalers_eth.joblib")
-close_scaler = scalers['close']
+scalers = load_scalers("python/models/scalers_eth.npz", "python/models/scalers_eth.joblib",
+                       "python/models/scalers_eth_legacy.npz",
+                       ["python/models/lstm_eth_model.keras", "python/models/lstm_eth.weights.h5",
+                        "python/models/config_eth.json"])
+close_min = float(scalers['mins'][scalers['index']['close']])
+close_scale = float(scalers['scales'][scalers['index']['close']])
 
 # List of feature names
 FEATURES = [
@@ -22,59 +80,140 @@ FEATURES = [
     'price_sma10_ratio', 'price_sma50_ratio'
 ]
 
+# Hệ số scale theo thứ tự FEATURES: scaled = x * SCALE + OFFSET
+# (float32 như lúc train, đầu vào model không cần ép kiểu lại)
+_cols = [scalers['index'][col] for col in FEATURES]
+SCALE = (1.0 / scalers['scales'][_cols]).astype(np.float32)
+OFFSET = (-scalers['mins'][_cols] * SCALE).astype(np.float32)
+
+# Load model
+def load_lstm_model(weights_path, model_path, config_path):
+    """
+    Dựng lại kiến trúc theo hyperparameters đã lưu trong file config lúc train
+    và chỉ nạp trọng số (bỏ qua trạng thái optimizer). Dùng file .keras đầy đủ
+    nếu thiếu file trọng số/config hoặc file trọng số cũ hơn file .keras
+    """
+    weights_fresh = os.path.exists(weights_path) and (
+        not os.path.exists(model_path)
+        or os.path.getmtime(weights_path) >= os.path.getmtime(model_path)
+    )
+    if weights_fresh and os.path.exists(config_path):
+        with open(config_path) as f:
+            config = json.load(f)
+        hyperparams = config['hyperparameters']
+        n_features = len(config.get('feature_names', FEATURES))
+        model = build_enhanced_lstm_model((hyperparams['sequence_length'], n_features), hyperparams)
+        model.load_weights(weights_path)
+        return model
+    return load_model(model_path)
+
+model = load_lstm_model("python/models/lstm_eth.weights.h5", "python/models/lstm_eth_model.keras",
+                        "python/models/config_eth.json")
+
 # =========================
 # Feature calculation utils
 # =========================
-def calculate_rsi(prices, window=14):
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def calculate_ema(prices, window=30):
-    return prices.ewm(span=window, adjust=False).mean()
-
-def calculate_sma(prices, window):
-    return prices.rolling(window=window).mean()
-
-def calculate_bollinger_bands(prices, window=20, num_std=2):
-    sma = prices.rolling(window=window).mean()
-    std = prices.rolling(window=window).std()
-    upper = sma + (std * num_std)
-    lower = sma - (std * num_std)
-    return upper, lower
+# Cửa sổ chỉ báo lấy từ TECH_PARAMS của script train
+WARMUP = FEATURE_WARMUP
+SEQ_LEN = model.input_shape[1]
+RSI_WINDOW = TECH_PARAMS['rsi_window']
+SMA_SHORT_WINDOW = TECH_PARAMS['sma_10_window']
+SMA_LONG_WINDOW = TECH_PARAMS['sma_50_window']
+BB_WINDOW = TECH_PARAMS['bollinger_window']
+BB_STD = float(TECH_PARAMS['bollinger_std'])
+EMA_ALPHA = 2 / (TECH_PARAMS['ema_window'] + 1)
+EMA_COL = FEATURES.index('ema_30')
+# Số giá gần nhất cần để tính một hàng feature mới (RSI cần thêm một giá cho delta)
+HISTORY_LEN = max(WARMUP, RSI_WINDOW) + 1
 
 def engineer_features(df):
     """
-    Tính đầy đủ 11 features
-    """
-    df = df.copy()
-    df['rsi_14'] = calculate_rsi(df['close'])
-    df['ema_30'] = calculate_ema(df['close'])
-    df['sma_10'] = calculate_sma(df['close'], window=10)
-    df['sma_50'] = calculate_sma(df['close'], window=50)
-    bb_upper, bb_lower = calculate_bollinger_bands(df['close'])
-    df['bb_upper'] = bb_upper
-    df['bb_lower'] = bb_lower
-    df['bb_width'] = df['bb_upper'] - df['bb_lower']
-    df['bb_position'] = (df['close'] - df['bb_lower']) / df['bb_width']
-    df['price_sma10_ratio'] = df['close'] / df['sma_10']
-    df['price_sma50_ratio'] = df['close'] / df['sma_50']
-    df = df.dropna().reset_index(drop=True)
-    return df
+    Tính đầy đủ 11 features trong một lần duyệt (kernel numba), bỏ các hàng
+    khởi động và hàng NaN giống lúc train. Trả về (mảng float32 theo thứ tự
+    FEATURES, EMA của ngày cuối cùng)
+    """
+    arr = build_feature_matrix(df['close'].to_numpy())
+    # EMA không bao giờ NaN sau khởi động, lấy trước khi lọc hàng
+    return trim_feature_rows(arr), float(arr[-1, EMA_COL])
+
+# =========================
+# Forecast graph
+# =========================
+def next_feature_row(closes, ema):
+    """
+    Hàng feature (thứ tự FEATURES) của ngày cuối trong cửa sổ HISTORY_LEN giá
+    gần nhất, tính bằng các phép toán TensorFlow
+    """
+    price = closes[-1]
+    delta = closes[-RSI_WINDOW:] - closes[-RSI_WINDOW - 1:-1]
+    rsi = 100 - 100 / (1 + tf.reduce_sum(tf.nn.relu(delta)) / tf.reduce_sum(tf.nn.relu(-delta)))
+    sma10 = tf.reduce_mean(closes[-SMA_SHORT_WINDOW:])
+    sma50 = tf.reduce_mean(closes[-SMA_LONG_WINDOW:])
+    bb_mid = tf.reduce_mean(closes[-BB_WINDOW:])
+    bb_sd = tf.sqrt(tf.reduce_sum(tf.square(closes[-BB_WINDOW:] - bb_mid)) / (BB_WINDOW - 1))
+    upper, lower = bb_mid + BB_STD * bb_sd, bb_mid - BB_STD * bb_sd
+    width = upper - lower
+    return tf.stack([
+        price, rsi, ema, sma10, sma50, upper, lower, width,
+        (price - lower) / width, price / sma10, price / sma50
+    ])
+
+@tf.function(input_signature=[
+    tf.TensorSpec([SEQ_LEN, len(FEATURES)], tf.float32),
+    tf.TensorSpec([HISTORY_LEN], tf.float64),
+    tf.TensorSpec([], tf.float64),
+    tf.TensorSpec([], tf.int32),
+])
+def forecast(window, closes, ema, days):
+    """
+    Dự đoán ngày kế tiếp và thêm `days` ngày trong một lần gọi graph:
+    mỗi giá dự đoán được nối vào chuỗi giá, tính hàng feature mới,
+    scale và dịch cửa sổ đầu vào. Cửa sổ giữ ở float32; chuỗi giá và EMA
+    giữ float64 để tính feature
+    """
+    preds = tf.TensorArray(tf.float64, size=days + 1)
+
+    def body(i, window, closes, ema, preds):
+        pred = tf.cast(model(window[tf.newaxis], training=False)[0, 0], tf.float64)
+        price = pred * close_scale + close_min
+        closes = tf.concat([closes[1:], [price]], axis=0)
+        ema = EMA_ALPHA * price + (1 - EMA_ALPHA) * ema
+        row = tf.cast(next_feature_row(closes, ema), tf.float32) * SCALE + OFFSET
+        window = tf.concat([window[1:], row[tf.newaxis]], axis=0)
+        return i + 1, window, closes, ema, preds.write(i, pred)
+
+    _, _, _, _, preds = tf.while_loop(
+        lambda i, *_: i <= days, body, (tf.constant(0), window, closes, ema, preds)
+    )
+    return preds.stack()
 
 # =========================
 # Load and preprocess data
 # =========================
-def load_data():
-    df = pd.read_csv("python/data/ETH.csv", usecols=["date","close"])
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.sort_values('date').reset_index(drop=True)
+def load_data(csv_path="python/data/ETH.csv", cache_path="python/data/ETH.parquet"):
+    """
+    Đọc cửa sổ 5 năm từ file parquet cache nếu mới hơn CSV;
+    ngược lại parse CSV rồi ghi lại cache
+    """
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(csv_path):
+        return pd.read_parquet(cache_path, engine="pyarrow")
+    
+    # Parser CSV đa luồng của pyarrow, đọc sẵn kiểu timestamp/float64
+    tbl = pv.read_csv(csv_path, convert_options=pv.ConvertOptions(
+        include_columns=["date", "close"],
+        column_types={"date": pa.timestamp("ns"), "close": pa.float64()}
+    ))
+    df = tbl.to_pandas()
+    # File thường đã sắp xếp theo ngày, chỉ sort khi cần
+    if not df['date'].is_monotonic_increasing:
+        df = df.sort_values('date').reset_index(drop=True)
     end_date = df['date'].max()
     start_date = end_date - timedelta(days=5*365)
     df = df[df['date'] >= start_date].reset_index(drop=True)
+    try:
+        write_atomic(cache_path, lambda f: df.to_parquet(f, engine="pyarrow", index=False))
+    except OSError:
+        pass  # Thư mục chỉ đọc: bỏ qua cache
     return df
 
 # =========================
@@ -82,51 +221,19 @@ def load_data():
 # =========================
 def predict():
     df = load_data()
-    df_feat = engineer_features(df)
-    
-    seq_len = 30
-    last_seq_df = df_feat.iloc[-seq_len:].reset_index(drop=True)
-    
-    # Scale all features
-    scaled = np.zeros_like(last_seq_df[FEATURES].values)
-    for i, col in enumerate(FEATURES):
-        scaled[:, i] = scalers[col].transform(last_seq_df[col].values.reshape(-1,1)).flatten()
+    feats, ema = engineer_features(df)
     
-    # Predict next day
-    inp = scaled.reshape(1, seq_len, scaled.shape[1])
-    pred = model.predict(inp, verbose=0)[0,0]
-    next_price = close_scaler.inverse_transform([[pred]])[0,0]
+    # Scale all features in one broadcast
+    scaled = feats[-SEQ_LEN:] * SCALE + OFFSET
     
-    # Multi-step forecast
-    preds = []
-    df_future = df.copy()
-    for _ in range(7):
-        # Append predicted close to df_future
-        pred_close = close_scaler.inverse_transform([[pred]])[0,0]
-        next_date = df_future['date'].iloc[-1] + timedelta(days=1)
-        df_future = pd.concat([
-            df_future,
-            pd.DataFrame({'date':[next_date],'close':[pred_close]})
-        ], ignore_index=True)
-        
-        # Recompute features
-        df_feat_future = engineer_features(df_future)
-        last_seq_df = df_feat_future.iloc[-seq_len:].reset_index(drop=True)
-        
-        # Scale
-        scaled = np.zeros_like(last_seq_df[FEATURES].values)
-        for i, col in enumerate(FEATURES):
-            scaled[:, i] = scalers[col].transform(last_seq_df[col].values.reshape(-1,1)).flatten()
-        
-        # Predict next
-        inp = scaled.reshape(1, seq_len, scaled.shape[1])
-        pred = model.predict(inp, verbose=0)[0,0]
-        preds.append(pred)
+    # Next day + 7-day forecast in one graph call
+    closes = df['close'].to_numpy(dtype=np.float64)[-HISTORY_LEN:]
+    preds = forecast(scaled, closes, ema, 7).numpy()
     
     # Inverse transform all predictions
-    dummy_multi = np.zeros((len(preds),1))
-    dummy_multi[:,0] = preds
-    multi_prices = close_scaler.inverse_transform(dummy_multi).flatten().tolist()
+    prices = preds * close_scale + close_min
+    next_price = float(prices[0])
+    multi_prices = prices[1:].tolist()
     
     return next_price, multi_prices
 
@@ -1,40 +1,177 @@
 import sys
 import json
+import math
 import numpy as np
 import pandas as pd
 from typing import List, Dict, Any, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+# TA-Lib (vòng lặp C) cho SMA và độ lệch chuẩn nếu có cài đặt, ngược lại dùng numpy/pandas.
+# RSI/EMA/MACD/Stochastic luôn theo định nghĩa pandas: TA-Lib khởi tạo EMA khác
+# (ewm adjust=True) và trả về 0 thay vì NaN với chuỗi giá phẳng, làm đổi tín hiệu
+try:
+    import talib
+except ImportError:
+    talib = None
+
+# orjson (encoder Rust) nếu có cài đặt, ngược lại dùng json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _finite_or_none(value):
+    """
+    Thay NaN/Infinity bằng None (null) như orjson; JSON.parse bên Node không đọc được NaN
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite_or_none(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite_or_none(item) for item in value]
+    return value
+
+
+def _write_json(result: Dict[str, Any], indent: bool = True):
+    """
+    Ghi kết quả ra stdout dạng JSON (một dòng nếu indent=False), giữ nguyên
+    ký tự tiếng Việt như ensure_ascii=False. Giá trị không hữu hạn ghi thành null
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        sys.stdout.buffer.write(orjson.dumps(result, option=option))
+    else:
+        sys.stdout.write(json.dumps(_finite_or_none(result), ensure_ascii=False,
+                                    indent=2 if indent else None) + "\n")
+    sys.stdout.flush()
+
+
+def _to_array(values) -> Optional[np.ndarray]:
+    """
+    Chuyển dữ liệu đầu vào thành mảng float64 liên tục (None nếu rỗng)
+    """
+    if values is None:
+        return None
+    arr = np.ascontiguousarray(values, dtype=np.float64)
+    return arr if arr.size else None
+
+
+def _like_prices(values: Optional[np.ndarray], prices: np.ndarray) -> np.ndarray:
+    """
+    Mảng high/low cùng độ dài với prices; giá trị đơn được lặp lại,
+    không có thì dùng chính prices
+    """
+    if values is None:
+        return prices
+    return np.ascontiguousarray(np.broadcast_to(values, prices.shape))
+
+
+def _history(values: np.ndarray, decimals: int, size: int = 10) -> List[float]:
+    """
+    `size` giá trị hợp lệ gần nhất, đã làm tròn; chỉ xét phần đuôi của chuỗi
+    """
+    tail = values[-size:]
+    # NaN thường chỉ nằm ở đoạn khởi động đầu chuỗi; hiếm khi lọt vào đuôi
+    if np.isnan(tail).any():
+        tail = values[~np.isnan(values)][-size:]
+    return np.round(tail, decimals).tolist()
+
+
+def _rsi(prices: np.ndarray, period: int) -> np.ndarray:
+    # Thay đổi đầu tiên tính là 0 (như diff() + where trước đây)
+    delta = np.diff(prices, prepend=prices[0])
+    gain = pd.Series(np.maximum(delta, 0.0))
+    loss = pd.Series(-np.minimum(delta, 0.0))
+    avg_gain = gain.ewm(alpha=1/period, min_periods=period).mean()
+    avg_loss = loss.ewm(alpha=1/period, min_periods=period).mean()
+    rs = avg_gain / avg_loss
+    return (100 - (100 / (1 + rs))).to_numpy()
+
+
+def _ema(prices: np.ndarray, period: int) -> np.ndarray:
+    return pd.Series(prices).ewm(span=period).mean().to_numpy()
+
+
+def _sma(prices: np.ndarray, period: int) -> np.ndarray:
+    if talib is not None:
+        return talib.SMA(prices, timeperiod=period)
+    return pd.Series(prices).rolling(window=period).mean().to_numpy()
+
+
+def _macd(prices: np.ndarray, fast_period: int, slow_period: int, signal_period: int):
+    series = pd.Series(prices)
+    macd_line = series.ewm(span=fast_period).mean() - series.ewm(span=slow_period).mean()
+    signal_line = macd_line.ewm(span=signal_period).mean()
+    return macd_line.to_numpy(), signal_line.to_numpy(), (macd_line - signal_line).to_numpy()
+
+
+def _stddev(prices: np.ndarray, period: int) -> np.ndarray:
+    if talib is not None:
+        # TA-Lib dùng độ lệch chuẩn tổng thể; nhân hệ số để khớp std mẫu (ddof=1)
+        return talib.STDDEV(prices, timeperiod=period, nbdev=1) * np.sqrt(period / (period - 1))
+    # Std mẫu trên view trượt (N - period + 1, period), không copy dữ liệu
+    std = np.full(len(prices), np.nan)
+    if len(prices) >= period:
+        std[period - 1:] = np.lib.stride_tricks.sliding_window_view(prices, period).std(axis=-1, ddof=1)
+    return std
+
+
+def _bbands(prices: np.ndarray, period: int, std_dev: float, sma: Optional[np.ndarray] = None):
+    if sma is None:
+        sma = _sma(prices, period)
+    std = _stddev(prices, period)
+    return sma + std * std_dev, sma, sma - std * std_dev
+
+
+def _stochastic(prices: np.ndarray, highs: np.ndarray, lows: np.ndarray,
+                k_period: int, d_period: int):
+    lowest_low = pd.Series(lows).rolling(window=k_period).min()
+    highest_high = pd.Series(highs).rolling(window=k_period).max()
+    k_percent = ((pd.Series(prices) - lowest_low) / (highest_high - lowest_low)) * 100
+    d_percent = k_percent.rolling(window=d_period).mean()
+    return k_percent.to_numpy(), d_percent.to_numpy()
+
+
 class TechnicalIndicators:
     """
     Lớp tính toán các chỉ báo kỹ thuật cho crypto
     """
     
+    # Trọng số tín hiệu cho phần tổng hợp: tên tín hiệu -> chỉ số trong SIGNAL_WEIGHTS
+    SIGNAL_ID = {
+        'STRONG_BULLISH': 0,
+        'BULLISH': 1,
+        'BUY': 2,
+        'OVERSOLD': 3,
+        'NEUTRAL': 4,
+        'BEARISH': 5,
+        'SELL': 6,
+        'STRONG_BEARISH': 7,
+        'OVERBOUGHT': 8
+    }
+    SIGNAL_WEIGHTS = np.array([3, 2, 2, 1, 0, -2, -2, -3, -1], dtype=np.int8)
+    
     @staticmethod
-    def calculate_rsi(prices: List[float], period: int = 14) -> Dict[str, Any]:
+    def calculate_rsi(prices: List[float], period: int = 14, include_history: bool = True,
+                      series: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """
         Tính RSI (Relative Strength Index)
         RSI = 100 - (100 / (1 + RS))
         RS = Average Gain / Average Loss
         """
         try:
-            if len(prices) < period + 1:
+            prices = _to_array(prices)
+            if prices is None or len(prices) < period + 1:
                 return {"error": "Không đủ dữ liệu để tính RSI"}
             
-            df = pd.DataFrame({'price': prices})
-            delta = df['price'].diff()
-            
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
+            rsi = series if series is not None else _rsi(prices, period)
             
-            avg_gain = gain.ewm(alpha=1/period, min_periods=period).mean()
-            avg_loss = loss.ewm(alpha=1/period, min_periods=period).mean()
-    
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-            
-            current_rsi = rsi.iloc[-1]
+            current_rsi = rsi[-1]
             
             # Phân tích RSI - SỬA LẠI: RSI >= 70 là quá mua, RSI <= 30 là quá bán
             if current_rsi >= 70:
@@ -47,42 +184,40 @@ class TechnicalIndicators:
                 signal = "NEUTRAL"
                 message = "Vùng trung tính"
             
-            return {
+            result = {
                 "indicator": "RSI",
                 "value": round(current_rsi, 2),
                 "signal": signal,
                 "message": message,
-                "period": period,
-                "history": rsi.dropna().round(2).tolist()[-10:]
+                "period": period
             }
+            if include_history:
+                result["history"] = _history(rsi, 2)
+            return result
             
         except Exception as e:
             return {"error": f"Lỗi tính RSI: {str(e)}"}
     
     @staticmethod
-    def calculate_macd(prices: List[float], fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> Dict[str, Any]:
+    def calculate_macd(prices: List[float], fast_period: int = 12, slow_period: int = 26, signal_period: int = 9,
+                       include_history: bool = True, series: Optional[tuple] = None) -> Dict[str, Any]:
         """
         Tính MACD (Moving Average Convergence Divergence)
         """
         try:
-            if len(prices) < slow_period + signal_period:
+            prices = _to_array(prices)
+            if prices is None or len(prices) < slow_period + signal_period:
                 return {"error": "Không đủ dữ liệu để tính MACD"}
             
-            df = pd.DataFrame({'price': prices})
+            # Tính MACD, đường Signal và Histogram
+            macd_line, signal_line, histogram = (
+                series if series is not None else _macd(prices, fast_period, slow_period, signal_period)
+            )
             
-            # Tính EMA
-            ema_fast = df['price'].ewm(span=fast_period).mean()
-            ema_slow = df['price'].ewm(span=slow_period).mean()
-            
-            # Tính MACD
-            macd_line = ema_fast - ema_slow
-            signal_line = macd_line.ewm(span=signal_period).mean()
-            histogram = macd_line - signal_line
-            
-            current_macd = macd_line.iloc[-1]
-            current_signal = signal_line.iloc[-1]
-            current_histogram = histogram.iloc[-1]
-            prev_histogram = histogram.iloc[-2] if len(histogram) > 1 else 0
+            current_macd = macd_line[-1]
+            current_signal = signal_line[-1]
+            current_histogram = histogram[-1]
+            prev_histogram = histogram[-2] if len(histogram) > 1 else 0
             
             # Phân tích MACD
             if current_macd > current_signal and prev_histogram <= 0 and current_histogram > 0:
@@ -98,45 +233,43 @@ class TechnicalIndicators:
                 signal = "BEARISH"
                 message = "MACD dưới Signal - Xu hướng giảm"
             
-            return {
+            result = {
                 "indicator": "MACD",
                 "macd": round(current_macd, 4),
                 "signal": round(current_signal, 4),
                 "histogram": round(current_histogram, 4),
                 "trend": signal,
-                "message": message,
-                "history": {
-                    "macd": macd_line.dropna().round(4).tolist()[-10:],
-                    "signal": signal_line.dropna().round(4).tolist()[-10:],
-                    "histogram": histogram.dropna().round(4).tolist()[-10:]
-                }
+                "message": message
             }
+            if include_history:
+                result["history"] = {
+                    "macd": _history(macd_line, 4),
+                    "signal": _history(signal_line, 4),
+                    "histogram": _history(histogram, 4)
+                }
+            return result
             
         except Exception as e:
             return {"error": f"Lỗi tính MACD: {str(e)}"}
     
     @staticmethod
-    def calculate_bollinger_bands(prices: List[float], period: int = 20, std_dev: float = 2) -> Dict[str, Any]:
+    def calculate_bollinger_bands(prices: List[float], period: int = 20, std_dev: float = 2,
+                                  series: Optional[tuple] = None) -> Dict[str, Any]:
         """
         Tính Bollinger Bands
         """
         try:
-            if len(prices) < period:
+            prices = _to_array(prices)
+            if prices is None or len(prices) < period:
                 return {"error": "Không đủ dữ liệu để tính Bollinger Bands"}
             
-            df = pd.DataFrame({'price': prices})
-            
-            # Tính SMA và standard deviation
-            sma = df['price'].rolling(window=period).mean()
-            std = df['price'].rolling(window=period).std()
-            
-            upper_band = sma + (std * std_dev)
-            lower_band = sma - (std * std_dev)
+            # Tính band trên, đường giữa (SMA) và band dưới
+            upper_band, sma, lower_band = series if series is not None else _bbands(prices, period, std_dev)
             
             current_price = prices[-1]
-            current_upper = upper_band.iloc[-1]
-            current_lower = lower_band.iloc[-1]
-            current_middle = sma.iloc[-1]
+            current_upper = upper_band[-1]
+            current_lower = lower_band[-1]
+            current_middle = sma[-1]
             
             # Phân tích Bollinger Bands
             band_position = (current_price - current_lower) / (current_upper - current_lower)
@@ -170,23 +303,24 @@ class TechnicalIndicators:
             return {"error": f"Lỗi tính Bollinger Bands: {str(e)}"}
     
     @staticmethod
-    def calculate_ema(prices: List[float], period: int = 21) -> Dict[str, Any]:
+    def calculate_ema(prices: List[float], period: int = 21, include_history: bool = True,
+                      series: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """
         Tính EMA (Exponential Moving Average)
         """
         try:
-            if len(prices) < period:
+            prices = _to_array(prices)
+            if prices is None or len(prices) < period:
                 return {"error": "Không đủ dữ liệu để tính EMA"}
             
-            df = pd.DataFrame({'price': prices})
-            ema = df['price'].ewm(span=period).mean()
+            ema = series if series is not None else _ema(prices, period)
             
             current_price = prices[-1]
-            current_ema = ema.iloc[-1]
+            current_ema = ema[-1]
             
             # Tính độ dốc của EMA
-            if len(ema) >= 2:
-                ema_slope = (ema.iloc[-1] - ema.iloc[-2]) / ema.iloc[-2] * 100
+            if len(ema) >= 2 and not np.isnan(ema[-2]):
+                ema_slope = (ema[-1] - ema[-2]) / ema[-2] * 100
             else:
                 ema_slope = 0
             
@@ -206,37 +340,40 @@ class TechnicalIndicators:
                     signal = "BEARISH"
                     message = f"Giá dưới EMA{period} - Xu hướng giảm"
             
-            return {
+            result = {
                 "indicator": f"EMA_{period}",
                 "current_price": round(current_price, 2),
                 "ema_value": round(current_ema, 2),
                 "signal": signal,
                 "message": message,
-                "ema_slope": round(ema_slope, 4),
-                "history": ema.dropna().round(2).tolist()[-10:]
+                "ema_slope": round(ema_slope, 4)
             }
+            if include_history:
+                result["history"] = _history(ema, 2)
+            return result
             
         except Exception as e:
             return {"error": f"Lỗi tính EMA: {str(e)}"}
     
     @staticmethod
-    def calculate_sma(prices: List[float], period: int = 20) -> Dict[str, Any]:
+    def calculate_sma(prices: List[float], period: int = 20, include_history: bool = True,
+                      series: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """
         Tính SMA (Simple Moving Average)
         """
         try:
-            if len(prices) < period:
+            prices = _to_array(prices)
+            if prices is None or len(prices) < period:
                 return {"error": "Không đủ dữ liệu để tính SMA"}
             
-            df = pd.DataFrame({'price': prices})
-            sma = df['price'].rolling(window=period).mean()
+            sma = series if series is not None else _sma(prices, period)
             
             current_price = prices[-1]
-            current_sma = sma.iloc[-1]
+            current_sma = sma[-1]
             
             # Tính độ dốc của SMA
-            if len(sma) >= 2:
-                sma_slope = (sma.iloc[-1] - sma.iloc[-2]) / sma.iloc[-2] * 100
+            if len(sma) >= 2 and not np.isnan(sma[-2]):
+                sma_slope = (sma[-1] - sma[-2]) / sma[-2] * 100
             else:
                 sma_slope = 0
             
@@ -256,33 +393,37 @@ class TechnicalIndicators:
                     signal = "BEARISH"
                     message = f"Giá dưới SMA{period} - Xu hướng giảm"
             
-            return {
+            result = {
                 "indicator": f"SMA_{period}",
                 "current_price": round(current_price, 2),
                 "sma_value": round(current_sma, 2),
                 "signal": signal,
                 "message": message,
-                "sma_slope": round(sma_slope, 4),
-                "history": sma.dropna().round(2).tolist()[-10:]
+                "sma_slope": round(sma_slope, 4)
             }
+            if include_history:
+                result["history"] = _history(sma, 2)
+            return result
             
         except Exception as e:
             return {"error": f"Lỗi tính SMA: {str(e)}"}
     
     @staticmethod
-    def calculate_volume(prices: List[float], volumes: List[float], period: int = 20) -> Dict[str, Any]:
+    def calculate_volume(prices: List[float], volumes: List[float], period: int = 20,
+                         include_history: bool = True, series: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """
         Tính trung bình khối lượng giao dịch và Volume Rate of Change
         """
         try:
-            if len(volumes) < period:
+            prices = _to_array(prices)
+            volumes = _to_array(volumes)
+            if volumes is None or len(volumes) < period:
                 return {"error": "Không đủ dữ liệu để tính khối lượng giao dịch"}
             
-            df = pd.DataFrame({'volume': volumes, 'price': prices})
-            sma_volume = df['volume'].rolling(window=period).mean()
+            sma_volume = series if series is not None else _sma(volumes, period)
             
             current_volume = volumes[-1]
-            current_sma_volume = sma_volume.iloc[-1]
+            current_sma_volume = sma_volume[-1]
             
             # Tính Volume Rate of Change
             if len(volumes) >= 2:
@@ -314,51 +455,50 @@ class TechnicalIndicators:
                 signal = "NEUTRAL"
                 message = "Khối lượng thấp - Tín hiệu không rõ ràng"
             
-            return {
+            result = {
                 "indicator": f"VOLUME_{period}",
                 "current_volume": round(current_volume, 2),
                 "sma_volume": round(current_sma_volume, 2),
                 "volume_ratio": round(volume_ratio, 2),
                 "volume_roc": round(volume_roc, 2),
                 "signal": signal,
-                "message": message,
-                "history": sma_volume.dropna().round(2).tolist()[-10:]
+                "message": message
             }
+            if include_history:
+                result["history"] = _history(sma_volume, 2)
+            return result
             
         except Exception as e:
             return {"error": f"Lỗi tính khối lượng giao dịch: {str(e)}"}
     
     @staticmethod
     def calculate_stochastic(prices: List[float], highs: Optional[List[float]] = None, 
-                        lows: Optional[List[float]] = None, k_period: int = 14, d_period: int = 3) -> Dict[str, Any]:
+                        lows: Optional[List[float]] = None, k_period: int = 14, d_period: int = 3,
+                        include_history: bool = True, series: Optional[tuple] = None) -> Dict[str, Any]:
         """
         Tính Stochastic Oscillator
         %K = (Current Close - Lowest Low) / (Highest High - Lowest Low) * 100
         %D = SMA của %K
         """
         try:
-            if len(prices) < k_period + d_period:
+            prices = _to_array(prices)
+            if prices is None or len(prices) < k_period + d_period:
                 return {"error": "Không đủ dữ liệu để tính Stochastic"}
             
-            df = pd.DataFrame({
-                'close': prices,
-                'high': highs if highs else prices,
-                'low': lows if lows else prices
-            })
-            
-            # Tính %K
-            lowest_low = df['low'].rolling(window=k_period).min()
-            highest_high = df['high'].rolling(window=k_period).max()
-            
-            k_percent = ((df['close'] - lowest_low) / (highest_high - lowest_low)) * 100
-            d_percent = k_percent.rolling(window=d_period).mean()
+            # Tính %K và %D (SMA của %K)
+            if series is not None:
+                k_percent, d_percent = series
+            else:
+                highs = _like_prices(_to_array(highs), prices)
+                lows = _like_prices(_to_array(lows), prices)
+                k_percent, d_percent = _stochastic(prices, highs, lows, k_period, d_period)
             
-            current_k = k_percent.iloc[-1]
-            current_d = d_percent.iloc[-1]
+            current_k = k_percent[-1]
+            current_d = d_percent[-1]
             
             # Phân tích Stochastic với crossover
-            prev_k = k_percent.iloc[-2] if len(k_percent) > 1 else current_k
-            prev_d = d_percent.iloc[-2] if len(d_percent) > 1 else current_d
+            prev_k = k_percent[-2] if len(k_percent) > 1 else current_k
+            prev_d = d_percent[-2] if len(d_percent) > 1 else current_d
             
             if current_k >= 80 and current_d >= 80:
                 signal = "OVERBOUGHT"
@@ -379,71 +519,111 @@ class TechnicalIndicators:
                 signal = "BEARISH"
                 message = "%K dưới %D - Xu hướng giảm"
             
-            return {
+            result = {
                 "indicator": "STOCHASTIC",
                 "k_percent": round(current_k, 2),
                 "d_percent": round(current_d, 2),
                 "signal": signal,
                 "message": message,
                 "k_period": k_period,
-                "d_period": d_period,
-                "history": {
-                    "k_percent": k_percent.dropna().round(2).tolist()[-10:],
-                    "d_percent": d_percent.dropna().round(2).tolist()[-10:]
-                }
+                "d_period": d_period
             }
+            if include_history:
+                result["history"] = {
+                    "k_percent": _history(k_percent, 2),
+                    "d_percent": _history(d_percent, 2)
+                }
+            return result
             
         except Exception as e:
             return {"error": f"Lỗi tính Stochastic: {str(e)}"}
     
+    @staticmethod
+    def compute_all(prices: List[float], volumes: Optional[List[float]] = None,
+                    highs: Optional[List[float]] = None, lows: Optional[List[float]] = None,
+                    indicators: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Tính một lần các chuỗi chỉ báo (tham số mặc định) cho các chỉ báo trong `indicators`;
+        SMA20 chỉ tính một lần, dùng chung cho SMA và Bollinger Bands
+        """
+        if indicators is None:
+            indicators = ['rsi', 'macd', 'bollinger', 'ema', 'sma', 'stochastic', 'volume']
+        names = {name.lower() for name in indicators}
+        prices = _to_array(prices)
+        volumes = _to_array(volumes)
+        series = {}
+        if prices is None:
+            return series
+        
+        sma20 = _sma(prices, 20) if names & {'sma', 'bollinger'} else None
+        if 'rsi' in names:
+            series['rsi'] = _rsi(prices, 14)
+        if 'macd' in names:
+            series['macd'] = _macd(prices, 12, 26, 9)
+        if 'bollinger' in names:
+            series['bollinger'] = _bbands(prices, 20, 2, sma=sma20)
+        if 'ema' in names:
+            series['ema'] = _ema(prices, 21)
+        if 'sma' in names:
+            series['sma'] = sma20
+        if 'stochastic' in names:
+            series['stochastic'] = _stochastic(prices, _like_prices(_to_array(highs), prices),
+                                               _like_prices(_to_array(lows), prices), 14, 3)
+        if 'volume' in names and volumes is not None:
+            series['volume'] = _sma(volumes, 20)
+        return series
+    
     @staticmethod
     def calculate_multiple_indicators(prices: List[float], volumes: Optional[List[float]] = None, 
                                     highs: Optional[List[float]] = None, lows: Optional[List[float]] = None,
-                                    indicators: Optional[List[str]] = None) -> Dict[str, Any]:
+                                    indicators: Optional[List[str]] = None,
+                                    include_history: bool = True) -> Dict[str, Any]:
         """
         Tính nhiều chỉ báo cùng lúc và đưa ra phân tích tổng hợp
+        (include_history=False bỏ chuỗi lịch sử 10 giá trị của từng chỉ báo)
         """
         if indicators is None:
             indicators = ['rsi', 'macd', 'bollinger', 'ema', 'sma', 'stochastic']
-            if volumes:
+            if volumes is not None and len(volumes):
                 indicators.append('volume')
         
         results = {}
         
+        # Tính trước toàn bộ chuỗi chỉ báo; nếu lỗi thì từng chỉ báo tự tính (và tự báo lỗi)
+        try:
+            series = TechnicalIndicators.compute_all(prices, volumes, highs, lows, indicators)
+        except Exception:
+            series = {}
+        
         for indicator in indicators:
             try:
                 if indicator.lower() == 'rsi':
-                    results['rsi'] = TechnicalIndicators.calculate_rsi(prices)
+                    results['rsi'] = TechnicalIndicators.calculate_rsi(prices, include_history=include_history,
+                                                                       series=series.get('rsi'))
                 elif indicator.lower() == 'macd':
-                    results['macd'] = TechnicalIndicators.calculate_macd(prices)
+                    results['macd'] = TechnicalIndicators.calculate_macd(prices, include_history=include_history,
+                                                                         series=series.get('macd'))
                 elif indicator.lower() == 'bollinger':
-                    results['bollinger'] = TechnicalIndicators.calculate_bollinger_bands(prices)
+                    results['bollinger'] = TechnicalIndicators.calculate_bollinger_bands(prices, series=series.get('bollinger'))
                 elif indicator.lower() == 'ema':
-                    results['ema'] = TechnicalIndicators.calculate_ema(prices)
+                    results['ema'] = TechnicalIndicators.calculate_ema(prices, include_history=include_history,
+                                                                       series=series.get('ema'))
                 elif indicator.lower() == 'sma':
-                    results['sma'] = TechnicalIndicators.calculate_sma(prices)
+                    results['sma'] = TechnicalIndicators.calculate_sma(prices, include_history=include_history,
+                                                                       series=series.get('sma'))
                 elif indicator.lower() == 'stochastic':
-                    results['stochastic'] = TechnicalIndicators.calculate_stochastic(prices, highs, lows)
-                elif indicator.lower() == 'volume' and volumes:
-                    results['volume'] = TechnicalIndicators.calculate_volume(prices, volumes)
+                    results['stochastic'] = TechnicalIndicators.calculate_stochastic(prices, highs, lows,
+                                                                                   include_history=include_history,
+                                                                                   series=series.get('stochastic'))
+                elif indicator.lower() == 'volume' and volumes is not None and len(volumes):
+                    results['volume'] = TechnicalIndicators.calculate_volume(prices, volumes, include_history=include_history,
+                                                                             series=series.get('volume'))
             except Exception as e:
                 results[indicator] = {"error": f"Lỗi tính {indicator}: {str(e)}"}
         
         # Phân tích tổng hợp với trọng số
-        signal_weights = {
-            'STRONG_BULLISH': 3,
-            'BULLISH': 2,
-            'BUY': 2,
-            'OVERSOLD': 1,
-            'NEUTRAL': 0,
-            'BEARISH': -2,
-            'SELL': -2,
-            'STRONG_BEARISH': -3,
-            'OVERBOUGHT': -1
-        }
-        
-        total_score = 0
-        valid_indicators = 0
+        weights = TechnicalIndicators.SIGNAL_WEIGHTS
+        signal_ids = []
         signal_details = []
         
         for key, value in results.items():
@@ -455,17 +635,20 @@ class TechnicalIndicators:
                 elif 'trend' in value:
                     signal = value['trend']
                 
-                if signal and signal in signal_weights:
-                    score = signal_weights[signal]
-                    total_score += score
-                    valid_indicators += 1
+                signal_id = TechnicalIndicators.SIGNAL_ID.get(signal) if signal else None
+                if signal_id is not None:
+                    signal_ids.append(signal_id)
                     signal_details.append({
                         'indicator': key.upper(),
                         'signal': signal,
-                        'score': score,
+                        'score': int(weights[signal_id]),
                         'message': value.get('message', '')
                     })
         
+        # Cộng điểm một lần trên mảng trọng số
+        total_score = int(weights[signal_ids].sum()) if signal_ids else 0
+        valid_indicators = len(signal_ids)
+        
         # Tính điểm trung bình
         if valid_indicators > 0:
             average_score = total_score / valid_indicators
@@ -502,68 +685,91 @@ class TechnicalIndicators:
         
         return results
 
+def dispatch(req: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Tính chỉ báo cho một request dạng
+    {"prices": [...], "indicator": "rsi", "volumes": [...], "highs": ..., "lows": ...}
+    """
+    indicator_name = str(req.get('indicator') or '').lower()
+    if req.get('prices') is None or not indicator_name:
+        return {"error": "Thiếu tham số. Cần: prices và indicator"}
+    
+    # Chuyển sang mảng float64 một lần, dùng chung cho mọi chỉ báo
+    # (dữ liệu không phải số trả về lỗi JSON thay vì traceback)
+    try:
+        prices = _to_array(req['prices'])
+        volumes = _to_array(req.get('volumes'))
+        highs = _to_array(req.get('highs'))
+        lows = _to_array(req.get('lows'))
+    except (TypeError, ValueError) as e:
+        return {"error": f"Lỗi: {str(e)}"}
+    
+    # Tạo instance
+    ta = TechnicalIndicators()
+    
+    # Tính chỉ báo dựa trên tên
+    if indicator_name == 'rsi':
+        return ta.calculate_rsi(prices)
+    elif indicator_name == 'macd':
+        return ta.calculate_macd(prices)
+    elif indicator_name == 'bollinger':
+        return ta.calculate_bollinger_bands(prices)
+    elif indicator_name == 'ema':
+        return ta.calculate_ema(prices)
+    elif indicator_name == 'sma':
+        return ta.calculate_sma(prices)
+    elif indicator_name == 'stochastic':
+        return ta.calculate_stochastic(prices, highs, lows)
+    elif indicator_name == 'volume' and volumes is not None:
+        return ta.calculate_volume(prices, volumes)
+    elif indicator_name == 'all':
+        return ta.calculate_multiple_indicators(prices, volumes, highs, lows)
+    return {"error": f"Chỉ báo '{req.get('indicator')}' không được hỗ trợ"}
+
+def serve():
+    """
+    Chế độ worker: đọc mỗi dòng stdin một request JSON, trả về đúng một dòng
+    JSON trên stdout (cùng thứ tự). Tiến trình sống lâu nên chỉ tốn chi phí
+    khởi động Python/import một lần
+    """
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            result = dispatch(json.loads(line))
+        except Exception as e:
+            result = {"error": f"Lỗi: {str(e)}"}
+        _write_json(result, indent=False)
+
 def main():
     # try:
-        if len(sys.argv) < 3:
-            print(json.dumps({"error": "Thiếu tham số. Cần: prices_json và indicator_name"}))
+        if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+            serve()
             return
         
-        prices_json = sys.argv[1]
-        indicator_name = sys.argv[2]
+        if len(sys.argv) < 3:
+            _write_json({"error": "Thiếu tham số. Cần: prices_json và indicator_name"})
+            return
         
-        # Parse prices
-        prices = json.loads(prices_json)
+        req = {
+            "prices": json.loads(sys.argv[1]),
+            "indicator": sys.argv[2]
+        }
         
         # Parse thêm volumes, highs, lows nếu có
-        volumes = None
-        highs = None
-        lows = None
+        for pos, key in ((3, "volumes"), (4, "highs"), (5, "lows")):
+            if len(sys.argv) > pos:
+                try:
+                    req[key] = json.loads(sys.argv[pos])
+                except:
+                    pass
         
-        if len(sys.argv) > 3:
-            try:
-                volumes = json.loads(sys.argv[3])
-            except:
-                pass
-                
-        if len(sys.argv) > 4:
-            try:
-                highs = json.loads(sys.argv[4])
-            except:
-                pass
-                
-        if len(sys.argv) > 5:
-            try:
-                lows = json.loads(sys.argv[5])
-            except:
-                pass
-        
-        # Tạo instance
-        ta = TechnicalIndicators()
-        
-        # Tính chỉ báo dựa trên tên
-        if indicator_name.lower() == 'rsi':
-            result = ta.calculate_rsi(prices)
-        elif indicator_name.lower() == 'macd':
-            result = ta.calculate_macd(prices)
-        elif indicator_name.lower() == 'bollinger':
-            result = ta.calculate_bollinger_bands(prices)
-        elif indicator_name.lower() == 'ema':
-            result = ta.calculate_ema(prices)
-        elif indicator_name.lower() == 'sma':
-            result = ta.calculate_sma(prices)
-        elif indicator_name.lower() == 'stochastic':
-            result = ta.calculate_stochastic(prices, highs, lows)
-        elif indicator_name.lower() == 'volume' and volumes:
-            result = ta.calculate_volume(prices, volumes)
-        elif indicator_name.lower() == 'all':
-            result = ta.calculate_multiple_indicators(prices, volumes, highs, lows)
-        else:
-            result = {"error": f"Chỉ báo '{indicator_name}' không được hỗ trợ"}
+        result = dispatch(req)
         
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        _write_json(result)
         
     # except Exception as e:
     #     print(json.dumps({"error": f"Lỗi: {str(e)}"}, ensure_ascii=False))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
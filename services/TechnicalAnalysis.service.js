@@ -5,6 +5,7 @@ import {
     spawn
 } from 'child_process';
 import path from 'path';
+import readline from 'readline';
 import binancePriceService from './BinancePrice.service.js';
 
 const __filename = fileURLToPath(
@@ -17,40 +18,81 @@ class TechnicalAnalysisService {
         this.pythonBinPath = path.join(__dirname, '../python/venv/bin/python3');
         this.priceCache = new Map();
         this.cacheTimeout = 5 * 60 * 1000; // 5 minutes
+        this.pythonWorker = null;
+        this.pendingRequests = [];
+        this.pythonRequestTimeout = 30 * 1000; // 30 seconds
+        this.maxStderrLength = 4096;
     }
 
-    async runPythonScript(prices, indicator, volumes = null, highs = null, lows = null) {
-        return new Promise((resolve, reject) => {
-            const args = [
-                this.pythonScriptPath,
-                JSON.stringify(prices),
-                indicator
-            ];
+    // One long-lived Python process answers every request (one JSON line in,
+    // one JSON line out, in order), so interpreter/import startup is paid once
+    getPythonWorker() {
+        if (this.pythonWorker) return this.pythonWorker;
+
+        const worker = spawn(this.pythonBinPath, [this.pythonScriptPath, '--worker']);
+        let error = '';
+
+        readline.createInterface({
+            input: worker.stdout
+        }).on('line', (line) => {
+            if (this.pythonWorker !== worker) return;
+            error = '';
+            const request = this.pendingRequests.shift();
+            if (request) {
+                clearTimeout(request.timer);
+                request.resolve(line.trim());
+            }
+        });
 
-            if (volumes) args.push(JSON.stringify(volumes));
-            if (highs) args.push(JSON.stringify(highs));
-            if (lows) args.push(JSON.stringify(lows));
+        worker.stderr.on('data', (data) => {
+            // Keep only the latest output: the worker lives as long as the server
+            error = (error + data.toString()).slice(-this.maxStderrLength);
+        });
 
-            const pythonProcess = spawn(this.pythonBinPath, args);
+        worker.on('error', (err) => this.stopPythonWorker(worker, err.message));
+        worker.on('close', (code) => this.stopPythonWorker(worker, error || `worker exited with code ${code}`));
+        worker.stdin.on('error', (err) => this.stopPythonWorker(worker, err.message));
 
-            let result = '';
-            let error = '';
+        this.pythonWorker = worker;
+        return worker;
+    }
 
-            pythonProcess.stdout.on('data', (data) => {
-                result += data.toString();
-            });
+    // Kill the worker and reject everything it still owes; the next request spawns a new one
+    stopPythonWorker(worker, reason) {
+        if (this.pythonWorker !== worker) return;
+        this.pythonWorker = null;
+        worker.kill();
+
+        const pending = this.pendingRequests;
+        this.pendingRequests = [];
+        pending.forEach((request) => {
+            clearTimeout(request.timer);
+            request.reject(new Error(`Python script failed: ${reason}`));
+        });
+    }
 
-            pythonProcess.stderr.on('data', (data) => {
-                error += data.toString();
-            });
+    async runPythonScript(prices, indicator, volumes = null, highs = null, lows = null) {
+        return new Promise((resolve, reject) => {
+            const request = {
+                prices,
+                indicator
+            };
 
-            pythonProcess.on('close', (code) => {
-                if (code !== 0) {
-                    reject(new Error(`Python script failed: ${error}`));
-                } else {
-                    resolve(result.trim());
-                }
+            if (volumes) request.volumes = volumes;
+            if (highs) request.highs = highs;
+            if (lows) request.lows = lows;
+
+            const worker = this.getPythonWorker();
+            const timer = setTimeout(() => {
+                this.stopPythonWorker(worker, `no response after ${this.pythonRequestTimeout / 1000}s`);
+            }, this.pythonRequestTimeout);
+
+            this.pendingRequests.push({
+                resolve,
+                reject,
+                timer
             });
+            worker.stdin.write(JSON.stringify(request) + '\n');
         });
     }
 